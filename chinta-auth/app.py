@@ -2,20 +2,26 @@
 Chinta Auth — OpenID Connect authentication service using Authlib.
 Interface described in api/auth-openapi.yml.
 """
+import hashlib
 import os
+import secrets
+from base64 import urlsafe_b64encode
 from pathlib import Path
-from urllib.parse import urljoin
+from urllib.parse import urlencode
 
 import httpx
+import msgspec
+import orjson
 import yaml
-from authlib.integrations.httpx_client import AsyncOAuth2Client
-from fastapi import FastAPI, HTTPException, Depends, Security
+from authlib.common.errors import AuthlibBaseError
+from fastapi import FastAPI, HTTPException, Depends, Request, Security
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from pydantic import BaseModel
 
-from config import get_config
+from config import Config, get_config
+from core import exchange_code, get_oidc_client, get_oidc_metadata
 
 APP_DIR = Path(__file__).resolve().parent
 API_SPEC_PATH = APP_DIR / "api" / "auth-openapi.yml"
@@ -24,66 +30,72 @@ app = FastAPI(
     title="Chinta Auth API",
     version="1.0.0",
     description="OpenID Connect authentication service",
+    default_response_class=ORJSONResponse,
+    # FastAPI's built-in /openapi.json route would shadow the cached one
+    # below; disable it (docs and redoc are re-registered against the
+    # custom route).
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
 )
 
 security = HTTPBearer(auto_error=False)
 
-# Cached OIDC metadata (authorization_endpoint, token_endpoint, userinfo_endpoint)
-_oidc_metadata: dict | None = None
-
 
 # --- Request/Response models (aligned with auth-openapi.yml) ---
+# msgspec Structs instead of Pydantic: parse + validate happen in one C pass
+# and the instances carry no per-field __dict__, which matters on the
+# authenticate hot path. The served schema comes from auth-openapi.yml.
 
-class AuthenticateRequest(BaseModel):
+class AuthenticateRequest(msgspec.Struct):
     code: str
     redirect_uri: str
     state: str | None = None
     nonce: str | None = None
 
 
-class AuthorizeUrlResponse(BaseModel):
+class AuthorizeUrlResponse(msgspec.Struct):
     authorize_url: str
     state: str
     nonce: str | None = None
 
 
-class ErrorResponse(BaseModel):
+class ErrorResponse(msgspec.Struct):
     error: str
     error_description: str | None = None
 
 
-# --- OIDC discovery and client helpers ---
+def _json_response(payload, status_code: int = 200) -> Response:
+    return Response(
+        content=msgspec.json.encode(payload),
+        status_code=status_code,
+        media_type="application/json",
+    )
 
-async def get_oidc_metadata() -> dict:
-    """Fetch OIDC discovery document (.well-known/openid-configuration)."""
-    global _oidc_metadata
-    if _oidc_metadata is not None:
-        return _oidc_metadata
-    cfg = get_config()
-    issuer = cfg["issuer"].rstrip("/")
-    url = urljoin(issuer + "/", ".well-known/openid-configuration")
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        _oidc_metadata = resp.json()
-    return _oidc_metadata
 
+# --- Route helpers ---
 
-async def get_oidc_client(redirect_uri: str | None = None) -> AsyncOAuth2Client:
-    """Create Authlib OIDC client with endpoints from discovery."""
-    cfg = get_config()
-    metadata = await get_oidc_metadata()
-    redirect = redirect_uri or (cfg["redirect_uri_base"].rstrip("/") + "/callback")
-    client = AsyncOAuth2Client(
-        client_id=cfg["client_id"],
-        client_secret=cfg["client_secret"],
-        redirect_uri=redirect,
-        scope="openid profile email",
-    )
-    client.authorization_endpoint = metadata["authorization_endpoint"]
-    client.token_endpoint = metadata["token_endpoint"]
-    client.userinfo_endpoint = metadata.get("userinfo_endpoint")
-    return client
+def _build_authorize_url(
+    metadata: dict,
+    client_id: str,
+    redirect_uri: str,
+    state: str,
+    nonce: str,
+) -> str:
+    """Assemble the IdP authorization URL from discovery metadata.
+
+    Pure string construction — no client object or network I/O needed.
+    """
+    endpoint = metadata["authorization_endpoint"]
+    query = urlencode({
+        "response_type": "code",
+        "client_id": client_id,
+        "redirect_uri": redirect_uri,
+        "scope": "openid profile email",
+        "state": state,
+        "nonce": nonce,
+    })
+    return endpoint + ("&" if "?" in endpoint else "?") + query
 
 
 def get_token_from_header(credentials: HTTPAuthorizationCredentials | None = Security(security)):
@@ -94,46 +106,49 @@ def get_token_from_header(credentials: HTTPAuthorizationCredentials | None = Sec
 
 # --- Routes ---
 
-@app.get("/auth/authorize", response_model=AuthorizeUrlResponse)
+@app.get("/auth/authorize")
 async def get_authorize_url(
     redirect_uri: str,
     state: str | None = None,
     nonce: str | None = None,
+    cfg: Config = Depends(get_config),
 ):
     """Return OpenID Connect authorization URL for redirecting the user to the IdP."""
-    import secrets
-    state = state or secrets.token_urlsafe(32)
-    nonce = nonce or secrets.token_urlsafe(32)
-    client = await get_oidc_client(redirect_uri=redirect_uri)
-    authorize_url, _ = client.create_authorization_url(
-        client.authorization_endpoint,
+    if state is None or nonce is None:
+        # One os.urandom read covers both values instead of two token_urlsafe calls.
+        raw = secrets.token_bytes(48)
+        state = state or urlsafe_b64encode(raw[:24]).rstrip(b"=").decode()
+        nonce = nonce or urlsafe_b64encode(raw[24:]).rstrip(b"=").decode()
+    metadata = await get_oidc_metadata()
+    authorize_url = _build_authorize_url(
+        metadata,
+        client_id=cfg.client_id,
         redirect_uri=redirect_uri,
         state=state,
         nonce=nonce,
     )
-    return AuthorizeUrlResponse(
+    return _json_response(AuthorizeUrlResponse(
         authorize_url=authorize_url,
         state=state,
         nonce=nonce,
-    )
+    ))
 
 
 @app.post("/authenticate")
-async def authenticate(body: AuthenticateRequest):
+async def authenticate(request: Request):
     """Exchange authorization code for tokens."""
-    client = await get_oidc_client(redirect_uri=body.redirect_uri)
     try:
-        token = await client.fetch_token(
-            client.token_endpoint,
-            code=body.code,
-            redirect_uri=body.redirect_uri,
-        )
-    except Exception as e:
+        body = msgspec.json.decode(await request.body(), type=AuthenticateRequest)
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        token = await exchange_code(body.code, body.redirect_uri)
+    except (httpx.HTTPError, AuthlibBaseError, ValueError) as e:
         raise HTTPException(
             status_code=401,
             detail={"error": "token_exchange_failed", "error_description": str(e)},
         )
-    return token
+    return _json_response(token)
 
 
 @app.get("/auth/callback")
@@ -147,19 +162,14 @@ async def auth_callback(
     Same as POST /authenticate but for GET (e.g. browser redirect with code in query).
     Keeps OAuth code exchange entirely inside auth service; gateway can proxy blindly.
     """
-    client = await get_oidc_client(redirect_uri=redirect_uri)
     try:
-        token = await client.fetch_token(
-            client.token_endpoint,
-            code=code,
-            redirect_uri=redirect_uri,
-        )
-    except Exception as e:
+        token = await exchange_code(code, redirect_uri)
+    except (httpx.HTTPError, AuthlibBaseError, ValueError) as e:
         raise HTTPException(
             status_code=401,
             detail={"error": "token_exchange_failed", "error_description": str(e)},
         )
-    return token
+    return _json_response(token)
 
 
 @app.get("/userinfo")
@@ -171,12 +181,18 @@ async def userinfo(access_token: str = Depends(get_token_from_header)):
             status_code=501,
             detail={"error": "userinfo_unsupported", "error_description": "IdP has no userinfo endpoint"},
         )
-    token = {"access_token": access_token, "token_type": "Bearer"}
     try:
-        resp = await client.get(client.userinfo_endpoint, token=token)
+        # withhold_token: the shared client must not attach its own token;
+        # the caller's bearer token is forwarded explicitly.
+        resp = await client.request(
+            "GET",
+            client.userinfo_endpoint,
+            withhold_token=True,
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
         resp.raise_for_status()
         return resp.json()
-    except Exception as e:
+    except (httpx.HTTPError, AuthlibBaseError, ValueError) as e:
         raise HTTPException(
             status_code=401,
             detail={"error": "userinfo_failed", "error_description": str(e)},
@@ -184,12 +200,13 @@ async def userinfo(access_token: str = Depends(get_token_from_header)):
 
 
 # --- Serve OpenAPI spec from YAML ---
+# The spec is immutable for the lifetime of the process, so read and parse it
+# once at import instead of re-running file I/O + YAML parse per request.
 
-@app.get("/openapi.json", include_in_schema=False)
-async def openapi_json():
-    """Serve OpenAPI schema. Built from api/auth-openapi.yml with FastAPI overlay."""
+def _build_openapi_schema() -> tuple[str, dict]:
     with open(API_SPEC_PATH) as f:
-        spec = yaml.safe_load(f)
+        yaml_text = f.read()
+    spec = yaml.safe_load(yaml_text)
     # Merge FastAPI-generated OpenAPI for accurate paths/servers if needed
     openapi_schema = get_openapi(
         title=spec["info"]["title"],
@@ -200,14 +217,48 @@ async def openapi_json():
     # Prefer YAML spec for components and paths so interface is exactly as in yml
     openapi_schema["paths"] = spec.get("paths", openapi_schema["paths"])
     openapi_schema["components"] = spec.get("components", openapi_schema.get("components", {}))
-    return openapi_schema
+    return yaml_text, openapi_schema
+
+
+_OPENAPI_YAML_TEXT, _OPENAPI_JSON = _build_openapi_schema()
+_OPENAPI_JSON_BYTES = orjson.dumps(_OPENAPI_JSON)
+
+# The spec is fixed per deployment, so a startup-computed ETag lets repeat
+# fetches (Swagger UI, codegen tooling) short-circuit to 304 Not Modified.
+_OPENAPI_ETAG = '"' + hashlib.sha256(_OPENAPI_YAML_TEXT.encode()).hexdigest()[:16] + '"'
+_OPENAPI_CACHE_HEADERS = {"ETag": _OPENAPI_ETAG, "Cache-Control": "public, max-age=3600"}
 
 
-@app.get("/openapi.yaml", include_in_schema=False, response_class=PlainTextResponse)
-async def openapi_yaml():
+@app.get("/openapi.json", include_in_schema=False)
+async def openapi_json(request: Request):
+    """Serve OpenAPI schema. Built from api/auth-openapi.yml with FastAPI overlay."""
+    if request.headers.get("if-none-match") == _OPENAPI_ETAG:
+        return Response(status_code=304, headers=_OPENAPI_CACHE_HEADERS)
+    return Response(
+        content=_OPENAPI_JSON_BYTES,
+        media_type="application/json",
+        headers=_OPENAPI_CACHE_HEADERS,
+    )
+
+
+@app.get("/openapi.yaml", include_in_schema=False)
+async def openapi_yaml(request: Request):
     """Serve OpenAPI schema as YAML."""
-    with open(API_SPEC_PATH) as f:
-        return f.read()
+    if request.headers.get("if-none-match") == _OPENAPI_ETAG:
+        return Response(status_code=304, headers=_OPENAPI_CACHE_HEADERS)
+    return PlainTextResponse(_OPENAPI_YAML_TEXT, headers=_OPENAPI_CACHE_HEADERS)
+
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_docs():
+    """Swagger UI against the cached spec (built-in docs were disabled above)."""
+    return get_swagger_ui_html(openapi_url="/openapi.json", title=app.title + " - Swagger UI")
+
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc_docs():
+    """ReDoc against the cached spec (built-in docs were disabled above)."""
+    return get_redoc_html(openapi_url="/openapi.json", title=app.title + " - ReDoc")
 
 
 @app.get("/health")
@@ -217,5 +268,19 @@ async def health():
 
 if __name__ == "__main__":
     import uvicorn
-    port = int(os.environ.get("PORT", "8083"))
-    uvicorn.run("app:app", host="0.0.0.0", port=port, reload=True)
+    workers = int(os.environ.get("WORKERS", "2"))
+    uds = os.environ.get("CHINTA_AUTH_UDS")
+    if uds:
+        # Co-deployed gateways can reach us over a unix socket, skipping the
+        # TCP handshake on the localhost hop.
+        uvicorn.run("app:app", uds=uds, loop="uvloop", http="httptools", workers=workers)
+    else:
+        port = int(os.environ.get("PORT", "8083"))
+        uvicorn.run(
+            "app:app",
+            host="0.0.0.0",
+            port=port,
+            loop="uvloop",
+            http="httptools",
+            workers=workers,
+        )
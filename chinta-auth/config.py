@@ -1,11 +1,24 @@
 """OIDC configuration from environment."""
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 
 
-def get_config():
-    return {
-        "issuer": os.environ.get("OIDC_ISSUER", "https://accounts.google.com"),
-        "client_id": os.environ.get("OIDC_CLIENT_ID", ""),
-        "client_secret": os.environ.get("OIDC_CLIENT_SECRET", ""),
-        "redirect_uri_base": os.environ.get("OIDC_REDIRECT_URI_BASE", "http://localhost:8083"),
-    }
+@dataclass(frozen=True, slots=True)
+class Config:
+    issuer: str
+    client_id: str
+    client_secret: str
+    redirect_uri_base: str
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    # Environment is fixed for the process lifetime; resolve once instead of
+    # re-reading os.environ on every request.
+    return Config(
+        issuer=os.environ.get("OIDC_ISSUER", "https://accounts.google.com"),
+        client_id=os.environ.get("OIDC_CLIENT_ID", ""),
+        client_secret=os.environ.get("OIDC_CLIENT_SECRET", ""),
+        redirect_uri_base=os.environ.get("OIDC_REDIRECT_URI_BASE", "http://localhost:8083"),
+    )
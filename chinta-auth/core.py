@@ -0,0 +1,125 @@
+"""
+OIDC discovery, client construction and code exchange, independent of the
+FastAPI app so callers (routes, co-deployed services, scripts) can use the
+flow without going through HTTP.
+"""
+import asyncio
+import os
+import time
+from urllib.parse import urljoin
+
+import httpx
+from authlib.integrations.httpx_client import AsyncOAuth2Client
+
+from config import get_config
+
+# Cached OIDC metadata (authorization_endpoint, token_endpoint, userinfo_endpoint),
+# keyed by issuer and refreshed after OIDC_DISCOVERY_TTL seconds so key/endpoint
+# rotation at the IdP is picked up without a restart.
+OIDC_DISCOVERY_TTL = float(os.environ.get("OIDC_DISCOVERY_TTL", "3600"))
+_oidc_metadata_cache: dict[str, tuple[float, dict]] = {}
+_cache_lock = asyncio.Lock()
+
+# The one constructed OAuth2 client, tagged with the metadata version it was
+# built against and rebuilt lazily when a discovery refresh bumps the version.
+# Keying a cache on the caller-supplied redirect_uri would let unauthenticated
+# requests grow it (one connection pool per entry) without bound; redirect_uri
+# is instead passed per call to fetch_token.
+_metadata_version = 0
+_cached_client: tuple[int, AsyncOAuth2Client] | None = None
+
+# Grace period before an evicted client's pool is closed, so requests that
+# grabbed it just before a metadata refresh can finish on its connections.
+_STALE_CLIENT_GRACE = 30.0
+_stale_close_tasks: set[asyncio.Task] = set()
+
+
+def _close_after_grace(client: AsyncOAuth2Client) -> None:
+    async def _close():
+        await asyncio.sleep(_STALE_CLIENT_GRACE)
+        await client.aclose()
+
+    task = asyncio.get_running_loop().create_task(_close())
+    _stale_close_tasks.add(task)
+    task.add_done_callback(_stale_close_tasks.discard)
+
+# Config is environment-derived and immutable for the process lifetime, so the
+# default callback target can be folded once at import.
+_DEFAULT_REDIRECT_URI = get_config().redirect_uri_base.rstrip("/") + "/callback"
+
+
+def get_oidc_metadata_sync() -> dict | None:
+    """Return cached discovery metadata if still fresh, without awaiting.
+
+    Hot paths call this first so a warm cache costs a dict lookup instead of
+    a coroutine round trip through the event loop.
+    """
+    issuer = get_config().issuer.rstrip("/")
+    ts, meta = _oidc_metadata_cache.get(issuer, (0.0, None))
+    if meta is not None and time.monotonic() - ts < OIDC_DISCOVERY_TTL:
+        return meta
+    return None
+
+
+async def get_oidc_metadata() -> dict:
+    """Fetch OIDC discovery document (.well-known/openid-configuration)."""
+    meta = get_oidc_metadata_sync()
+    if meta is not None:
+        return meta
+    cfg = get_config()
+    issuer = cfg.issuer.rstrip("/")
+    async with _cache_lock:
+        # Another task may have refreshed while we waited on the lock
+        ts, meta = _oidc_metadata_cache.get(issuer, (0.0, None))
+        if meta is not None and time.monotonic() - ts < OIDC_DISCOVERY_TTL:
+            return meta
+        url = urljoin(issuer + "/", ".well-known/openid-configuration")
+        async with httpx.AsyncClient() as client:
+            resp = await client.get(url)
+            resp.raise_for_status()
+            meta = resp.json()
+        _oidc_metadata_cache[issuer] = (time.monotonic(), meta)
+        global _metadata_version
+        _metadata_version += 1
+    return meta
+
+
+async def get_oidc_client() -> AsyncOAuth2Client:
+    """Return the shared Authlib OIDC client with endpoints from discovery."""
+    global _cached_client
+    cfg = get_config()
+    metadata = get_oidc_metadata_sync()
+    if metadata is None:
+        metadata = await get_oidc_metadata()
+    if _cached_client is not None and _cached_client[0] == _metadata_version:
+        return _cached_client[1]
+    client = AsyncOAuth2Client(
+        client_id=cfg.client_id,
+        client_secret=cfg.client_secret,
+        redirect_uri=_DEFAULT_REDIRECT_URI,
+        scope="openid profile email",
+    )
+    client.authorization_endpoint = metadata["authorization_endpoint"]
+    client.token_endpoint = metadata["token_endpoint"]
+    client.userinfo_endpoint = metadata.get("userinfo_endpoint")
+    stale = _cached_client
+    _cached_client = (_metadata_version, client)
+    if stale is not None:
+        # Release the evicted client's pool, but not out from under requests
+        # that are still mid-flight on it.
+        _close_after_grace(stale[1])
+    return client
+
+
+async def exchange_code(code: str, redirect_uri: str) -> dict:
+    """Exchange an authorization code for tokens at the IdP token endpoint."""
+    client = await get_oidc_client()
+    token = await client.fetch_token(
+        client.token_endpoint,
+        code=code,
+        redirect_uri=redirect_uri,
+    )
+    # fetch_token stashes the token on the shared client; clear it so one
+    # user's token can never become another request's default auth.
+    client.token = None
+    return token
@@ -1,21 +1,64 @@
 import os
+import re
+from contextlib import asynccontextmanager
 from typing import Optional
 
 import httpx
 from fastapi import Depends, FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse, RedirectResponse, Response
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.background import BackgroundTask
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Share long-lived HTTP/2-capable clients across all routes.
+
+    Upstream hops reuse persistent connections (and multiplexed H2 streams
+    where the upstream supports them) instead of paying DNS + TCP + TLS
+    setup per request. Each upstream gets its own client sized for its
+    traffic shape: auth sees many short small-payload requests, the backend
+    fewer but longer ones with larger bodies.
+
+    When CHINTA_AUTH_UDS names a unix socket (auth service co-deployed on
+    the same host), the auth client talks over it so the localhost hop
+    skips the TCP handshake entirely.
+    """
+    auth_uds = os.environ.get("CHINTA_AUTH_UDS")
+    auth_transport = httpx.AsyncHTTPTransport(uds=auth_uds) if auth_uds else None
+    app.state.auth_client = httpx.AsyncClient(
+        base_url=AUTH_BASE_URL,
+        http2=True,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=25),
+        timeout=httpx.Timeout(connect=2.0, read=5.0, write=5.0, pool=1.0),
+        transport=auth_transport,
+    )
+    app.state.backend_client = httpx.AsyncClient(
+        base_url=BACKEND_URL,
+        http2=True,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        timeout=15.0,
+    )
+    yield
+    await app.state.auth_client.aclose()
+    await app.state.backend_client.aclose()
 
 
 app = FastAPI(
     title="Chinta API Gateway",
     version="0.1.0",
     description="Edge gateway in front of internal Chinta services",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 
 security = HTTPBearer(auto_error=False)
 
+# Single case-insensitive scan over the User-Agent instead of several
+# Python-level substring passes on every landing request.
+_MOBILE_UA_RE = re.compile(r"mobile|android|iphone|ipad|ipod", re.IGNORECASE)
+
 
 AUTH_BASE_URL = os.environ.get("CHINTA_AUTH_URL", "http://chinta-auth:8083")
 WEB_UI_URL = os.environ.get("CHINTA_WEB_URL", "http://chinta-web:8000")
@@ -23,6 +66,21 @@ MOBILE_UI_URL = os.environ.get("CHINTA_MOBILE_URL", "http://chinta-web:8000/m")
 BACKEND_URL = os.environ.get("CHINTA_BACKEND_URL", "http://chinta-backend:8080")
 
 
+# Hop-by-hop headers that must not be forwarded upstream (httpx regenerates
+# host/content-length itself; the rest are connection-scoped per RFC 9110 §7.6.1).
+HOP_BY_HOP = frozenset({
+    b"host",
+    b"content-length",
+    b"connection",
+    b"transfer-encoding",
+    b"keep-alive",
+    b"upgrade",
+    b"proxy-authorization",
+    b"te",
+    b"trailers",
+})
+
+
 async def get_access_token(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
 ) -> str:
@@ -46,8 +104,7 @@ async def root(request: Request):
     if target == "web":
         return RedirectResponse(WEB_UI_URL)
 
-    ua = request.headers.get("user-agent", "").lower()
-    if "mobile" in ua or "android" in ua or "iphone" in ua:
+    if _MOBILE_UA_RE.search(request.headers.get("user-agent", "")):
         return RedirectResponse(MOBILE_UI_URL)
     return RedirectResponse(WEB_UI_URL)
 
@@ -59,7 +116,6 @@ async def proxy_auth(request: Request, path: str):
     it only forwards requests and responses. Authentication flow (login, callback,
     token exchange) is entirely owned by the auth service.
     """
-    url = f"{AUTH_BASE_URL}/auth/{path}"
     method = request.method
     params = dict(request.query_params)
     body = await request.body() if method in ("POST", "PUT", "PATCH") else None
@@ -67,15 +123,14 @@ async def proxy_auth(request: Request, path: str):
         k: v for k, v in request.headers.items()
         if k.lower() not in ("host", "connection", "content-length")
     }
-    async with httpx.AsyncClient() as client:
-        resp = await client.request(
-            method,
-            url,
-            params=params,
-            content=body,
-            headers=headers,
-            timeout=10.0,
-        )
+    client = request.app.state.auth_client
+    resp = await client.request(
+        method,
+        f"/auth/{path}",
+        params=params,
+        content=body,
+        headers=headers,
+    )
     return Response(
         content=resp.content,
         status_code=resp.status_code,
@@ -84,21 +139,30 @@ async def proxy_auth(request: Request, path: str):
 
 
 @app.get("/me")
-async def me(access_token: str = Depends(get_access_token)):
+async def me(request: Request, access_token: str = Depends(get_access_token)):
     """
     Example of the gateway asking Auth service for user info.
 
     Other gateway routes can depend on this to get user_id, org_id, etc.
     """
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{AUTH_BASE_URL}/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"},
-            timeout=10.0,
-        )
+    client = request.app.state.auth_client
+    resp = await client.get(
+        "/userinfo",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
     if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail=resp.json())
-    return resp.json()
+        try:
+            detail = resp.json()
+        except ValueError:
+            detail = resp.text
+        raise HTTPException(status_code=resp.status_code, detail=detail)
+    # Pass the upstream payload through untouched instead of decoding and
+    # re-serializing the same JSON.
+    return Response(
+        content=resp.content,
+        status_code=resp.status_code,
+        media_type=resp.headers.get("content-type", "application/json"),
+    )
 
 
 @app.api_route("/api/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
@@ -111,40 +175,76 @@ async def proxy_api(
     Very simple example of gateway → backend proxy with auth.
 
     - Validates the token via dependency.
-    - Forwards method, path, query and JSON body to backend.
+    - Streams method, path, query and body through to the backend verbatim,
+      without decoding or buffering payloads in the gateway.
     - Injects Authorization header so backend can trust user info later
       (or rely on gateway-only auth).
     """
-    url = f"{BACKEND_URL}/{path}"
     method = request.method
     query = dict(request.query_params)
-    try:
-        body = await request.json()
-    except Exception:
-        body = None
-
-    headers = dict(request.headers)
-    headers["Authorization"] = f"Bearer {access_token}"
-
-    async with httpx.AsyncClient() as client:
-        resp = await client.request(
-            method,
-            url,
-            params=query,
-            json=body,
-            headers=headers,
-            timeout=15.0,
-        )
 
-    return JSONResponse(
-        status_code=resp.status_code,
-        content=resp.json() if resp.headers.get("content-type", "").startswith("application/json") else resp.text,
+    # Drop the client's authorization header (always present — the token
+    # dependency 401s without it) so the injected one is the only copy.
+    headers = [
+        (k, v) for k, v in request.headers.raw
+        if k.lower() not in HOP_BY_HOP and k.lower() != b"authorization"
+    ]
+    headers.append((b"authorization", f"Bearer {access_token}".encode()))
+
+    # Only wire up the body stream for methods that carry one; GET/DELETE
+    # skip the receive-channel plumbing entirely.
+    content = request.stream() if method in ("POST", "PUT", "PATCH") else None
+
+    client = request.app.state.backend_client
+    upstream_request = client.build_request(
+        method,
+        f"/{path}",
+        params=query,
+        content=content,
+        headers=headers,
     )
+    upstream = await client.send(upstream_request, stream=True)
 
+    response = StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        background=BackgroundTask(upstream.aclose),
+    )
+    # Copy the upstream headers as raw pairs: the headers= mapping would
+    # comma-join duplicates (corrupting multiple Set-Cookie headers), and
+    # connection-scoped headers must not pass through either direction.
+    response.raw_headers = [
+        (k, v) for k, v in upstream.headers.raw if k.lower() not in HOP_BY_HOP
+    ]
+    return response
 
-if __name__ == "__main__":
-    import uvicorn
 
+if __name__ == "__main__":
     port = int(os.environ.get("CHINTA_GATEWAY_PORT", "8084"))
-    uvicorn.run("app:app", host="0.0.0.0", port=port, reload=True)
+    if os.environ.get("CHINTA_HTTP2") == "1":
+        # Uvicorn speaks HTTP/1.1 only; serve the edge with Hypercorn so
+        # clients can multiplex requests over H2 (needs TLS for ALPN).
+        import asyncio
+
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        config = Config.from_mapping(
+            bind=[f"0.0.0.0:{port}"],
+            alpn_protocols=["h2", "http/1.1"],
+            certfile=os.environ.get("CHINTA_TLS_CERT"),
+            keyfile=os.environ.get("CHINTA_TLS_KEY"),
+        )
+        asyncio.run(serve(app, config))
+    else:
+        import uvicorn
+
+        uvicorn.run(
+            "app:app",
+            host="0.0.0.0",
+            port=port,
+            loop="uvloop",
+            http="httptools",
+            workers=int(os.environ.get("WORKERS", "2")),
+        )
 